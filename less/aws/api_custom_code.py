@@ -1,3 +1,6 @@
+from less.aws.dataloader import DataLoader, request_loader
+
+
 class BaseCustomCode:
     def before_get(table_config, orm, params, access_token):
         return True
@@ -49,6 +52,13 @@ class CustomCodeReplaceableWithFile(BaseCustomCode):
             "custom_delete": NEW_PARAMS,
         }
         if custom_code_file and hasattr(custom_code_file, method_name):
+            # lookups made by user code during this call are memoized, and batched when queued with
+            # orm.load/load_many (see DataLoader); rows already in the result set are not fetched again
+            if "orm" in pass_through_params:
+                pass_through_params["orm"] = request_loader(pass_through_params["orm"])
+                if isinstance(pass_through_params["orm"], DataLoader) and \
+                        isinstance(pass_through_params.get("result_set"), list):
+                    pass_through_params["orm"].prime(pass_through_params["result_set"])
             try:
                 method_override = getattr(custom_code_file, method_name)
                 return method_override(**pass_through_params)
@@ -0,0 +1,101 @@
+import decimal
+import math
+
+from less.aws.table_base import InputError
+
+
+class ValidationError(InputError):
+    def __init__(self, errors):
+        super().__init__("Invalid values: " + "; ".join(errors))
+        self.errors = errors
+
+
+def _to_number(val):
+    # DynamoDB and numeric columns only take finite numbers, so NaN and Infinity are rejected
+    if isinstance(val, bool):
+        raise ValueError()
+    if isinstance(val, int):
+        return val
+    if isinstance(val, str):
+        try:
+            return int(val)
+        except ValueError:
+            val = decimal.Decimal(val)
+    if isinstance(val, float) and math.isfinite(val):
+        return val
+    if isinstance(val, decimal.Decimal) and val.is_finite():
+        return val
+    raise ValueError()
+
+
+def _to_bool(val):
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, str) and val.lower() in ("true", "false"):
+        return val.lower() == "true"
+    raise ValueError()
+
+
+def _to_list(val):
+    if isinstance(val, list):
+        return val
+    raise ValueError()
+
+
+CONVERTERS = {
+    "int": _to_number,
+    "bool": _to_bool,
+    "list": _to_list,
+}
+
+
+class BatchValidator(object):
+    # built once per table; validates and coerces a whole batch, collecting every error before raising
+    def __init__(self, table_configuration):
+        self.attribute_names = frozenset(a["name"] for a in table_configuration.attributes)
+        self.required = frozenset(a["name"] for a in table_configuration.required_attributes)
+        self.converters = {
+            a["name"]: CONVERTERS[a.get("type", "string")]
+            for a in table_configuration.attributes if a.get("type", "string") in CONVERTERS
+        }
+
+    def convert(self, name, val):
+        if name not in self.attribute_names:
+            raise InputError(f"Invalid attribute {name}")
+        converter = self.converters.get(name)
+        if converter is None or val is None:
+            return val
+        try:
+            return converter(val)
+        except (ValueError, decimal.InvalidOperation):
+            raise InputError(f"Invalid value for '{name}'")
+
+    def validate(self, values_batch, same_columns=False):
+        # returns the attribute columns of the batch (in record 0 order); with same_columns=True
+        # every record must have exactly those columns
+        columns = [k for k in values_batch[0] if k in self.attribute_names]
+        column_set = frozenset(columns)
+        errors = []
+        converted = []
+        for i, values in enumerate(values_batch):
+            present = self.attribute_names.intersection(values)
+            missing = self.required - present
+            if missing:
+                errors.append(f"Record {i} is missing required fields {', '.join(sorted(missing))}")
+            if same_columns and present != column_set:
+                errors.append(f"Record {i} does not have the same columns as record 0; all records must have "
+                              "same columns when batching")
+            for name, converter in self.converters.items():
+                val = values.get(name)
+                if val is None:
+                    continue
+                try:
+                    converted.append((values, name, converter(val)))
+                except (ValueError, decimal.InvalidOperation):
+                    errors.append(f"Record {i} has invalid value for '{name}'")
+        if errors:
+            raise ValidationError(errors)
+        # only coerce the caller's records once the whole batch is known to be valid
+        for values, name, val in converted:
+            values[name] = val
+        return columns
@@ -0,0 +1,130 @@
+import copy
+
+from less.aws.table_base import TableBase
+
+
+class Deferred(object):
+    # value of a queued key; reading it sends every key queued so far in one get_items call
+    def __init__(self, loader, key):
+        self._loader = loader
+        self._key = key
+
+    @property
+    def value(self):
+        return self._loader._resolve(self._key)
+
+
+class DataLoader(object):
+    """
+    Wraps a table for the duration of one request. Lookups are deduplicated and memoized, including misses;
+    writes made through the loader forget what was loaded. Every lookup returns its own copy of the row, so
+    changing it does not affect other lookups or a primed result set.
+
+    get_item is memoized but not batched: it has to return a row (or None) right away, so it sends its key
+    immediately and an existing loop of get_item calls still makes one round-trip per distinct key. Only code
+    that queues every key with load/load_many first and reads the values afterwards is batched - the first
+    read sends all queued keys in one get_items call:
+
+        owners = orm.load_many([{"id": row["owner_id"]} for row in result_set])
+        for row, owner in zip(result_set, owners):
+            row["owner"] = owner.value
+    """
+    def __init__(self, table):
+        self.table = table
+        self._pending = {}
+        self._loaded = {}
+
+    def _normalize(self, name, val):
+        # requests usually carry keys as strings while rows come back typed (e.g. Decimal for numeric
+        # columns), so both sides are converted through the attribute type before matching
+        if val is None or name not in self.table.attributes_by_name:
+            return val
+        if self.table.attributes_by_name[name].get("type", "string") == "string":
+            return str(val)
+        return self.table.validator.convert(name, val)
+
+    def _key_id(self, key):
+        return tuple(self._normalize(k, key[k]) for k in self.table.table_configuration.primary_key)
+
+    def load(self, key):
+        self.table._validate_primary_key(key)
+        key_id = self._key_id(key)
+        if key_id not in self._loaded:
+            self._pending.setdefault(key_id, key)
+        return Deferred(self, key)
+
+    def load_many(self, keys):
+        return [self.load(k) for k in keys]
+
+    def prime(self, items):
+        # memoizes rows that were already fetched, e.g. the result set passed to after_get
+        for item in items:
+            if isinstance(item, dict) and all(k in item for k in self.table.table_configuration.primary_key):
+                self._loaded[self._key_id(item)] = copy.deepcopy(item)
+
+    def dispatch(self):
+        pending = self._pending
+        self._pending = {}
+        keys = list(pending.values())
+        batch_size = self.table.max_batch_size
+        for i in range(0, len(keys), batch_size):
+            for item in self.table.get_items(keys[i:i+batch_size]):
+                self._loaded[self._key_id(item)] = item
+        for key_id in pending:
+            self._loaded.setdefault(key_id, None)
+
+    def _resolve(self, key):
+        key_id = self._key_id(key)
+        if key_id not in self._loaded:
+            # the key may have been forgotten by a write since it was queued
+            self._pending.setdefault(key_id, key)
+            self.dispatch()
+        return copy.deepcopy(self._loaded[key_id])
+
+    def clear(self):
+        # keys queued but not read yet stay queued
+        self._loaded = {}
+
+    def get_item(self, key):
+        return self.load(key).value
+
+    def get_items(self, keys):
+        items = [d.value for d in self.load_many(keys)]
+        return [item for item in items if item is not None]
+
+    def put_item(self, *args, **kwargs):
+        self.clear()
+        return self.table.put_item(*args, **kwargs)
+
+    def put_items(self, *args, **kwargs):
+        self.clear()
+        return self.table.put_items(*args, **kwargs)
+
+    def update_item(self, *args, **kwargs):
+        self.clear()
+        return self.table.update_item(*args, **kwargs)
+
+    def update_items(self, *args, **kwargs):
+        self.clear()
+        return self.table.update_items(*args, **kwargs)
+
+    def delete_item(self, *args, **kwargs):
+        self.clear()
+        return self.table.delete_item(*args, **kwargs)
+
+    def delete_items(self, *args, **kwargs):
+        self.clear()
+        return self.table.delete_items(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.table, name)
+
+
+def request_loader(orm):
+    # tables are wrapped once per request, including the tables of a dict of orms (as custom_get can receive);
+    # anything else (or an existing loader) is passed through
+    if isinstance(orm, TableBase):
+        return DataLoader(orm)
+    if isinstance(orm, dict):
+        return {name: request_loader(table) for name, table in orm.items()}
+    return orm
@@ -1,17 +1,32 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import boto3
 
-from less.aws.table_base import InputError, generate_id, TableBase
+from less.aws.table_base import InputError, TableBase
+
+
+class UnprocessedKeysError(Exception):
+    def __init__(self, message):
+        self.message = message
 
 
 class Table(TableBase):
-    def __init__(self, table_configuration):
+    def __init__(self, table_configuration, id_generator=None):
         self.table_configuration = table_configuration
+        if id_generator:
+            self.id_generator = id_generator
         self.attributes_by_name = {
             k["name"]: k for k in self.table_configuration.attributes
         }
         self.client = boto3.client('dynamodb')
+        self._update_templates = {}
 
     MAX_DYNAMODB_BATCH = 25
+    MAX_DYNAMODB_GET_BATCH = 100
+    MAX_UNPROCESSED_RETRIES = 5
+    MAX_DYNAMODB_TRANSACTION = 100
+    DEFAULT_UPDATE_CONCURRENCY = 10
 
     def translate_from_dynamodb_item(self, item, attributes_by_name=None):
         translated = {}
@@ -63,22 +78,28 @@ class Table(TableBase):
     def _key_from_params(self, params):
         return {k: {"S": params[k]} for k in self.table_configuration.primary_key}
 
+    def _batch_get(self, dynamodb_keys):
+        # BatchGetItem may return part of the keys as UnprocessedKeys (throttling, size limits); retry those
+        table_name = self.table_configuration.table_name
+        request_items = {table_name: {"Keys": dynamodb_keys}}
+        items = []
+        for attempt in range(Table.MAX_UNPROCESSED_RETRIES + 1):
+            if attempt:
+                time.sleep(0.05 * 2 ** (attempt - 1))
+            response = self.client.batch_get_item(RequestItems=request_items)
+            items += response.get("Responses", {}).get(table_name, [])
+            request_items = response.get("UnprocessedKeys")
+            if not request_items:
+                return items
+        raise UnprocessedKeysError(f"DynamoDB did not return all requested items from {table_name}")
+
     def get_items(self, keys):
         for key in keys:
             self._validate_primary_key(key)
-        response = self.client.batch_get_item(
-            RequestItems={
-                self.table_configuration.table_name: {
-                    "Keys": [self._key_from_params(k) for k in keys]
-                }
-            }
-        )
-        if "Responses" not in response:
-            return []
-        items = response["Responses"]
-        if self.table_configuration.table_name not in items:
-            return []
-        items = items[self.table_configuration.table_name]
+        dynamodb_keys = [self._key_from_params(k) for k in keys]
+        items = []
+        for i in range(0, len(dynamodb_keys), Table.MAX_DYNAMODB_GET_BATCH):
+            items += self._batch_get(dynamodb_keys[i:i+Table.MAX_DYNAMODB_GET_BATCH])
         return [self.translate_from_dynamodb_item(item) for item in items]
 
     def get_item(self, key):
@@ -201,18 +222,13 @@ class Table(TableBase):
             raise InputError("Missing values")
         if len(values_batch) > TableBase.MAX_BATCH:
             raise InputError(f"Cannot put more than {TableBase.MAX_BATCH} records at once")
-        preprocessed_batch = []
-        for rec in values_batch:
-            item = rec
-            if before_put:
+        if before_put:
+            for item in values_batch:
                 before_put(item)
-            for a in self.table_configuration.auto_generated_attributes:
-                item[a] = generate_id()
-            if [f["name"] for f in self.table_configuration.required_attributes if f["name"] not in item]:
-                raise InputError("Missing required fields")
-            preprocessed_batch.append(item)
-        for i in range(0, len(preprocessed_batch), Table.MAX_DYNAMODB_BATCH):
-            chunk = preprocessed_batch[i:i+Table.MAX_DYNAMODB_BATCH]
+        self._populate_auto_generated_attributes(values_batch)
+        self.validator.validate(values_batch)
+        for i in range(0, len(values_batch), Table.MAX_DYNAMODB_BATCH):
+            chunk = values_batch[i:i+Table.MAX_DYNAMODB_BATCH]
             self.client.batch_write_item(
                 RequestItems={
                     self.table_configuration.table_name: [
@@ -224,22 +240,95 @@ class Table(TableBase):
                     ]
                 }
             )
-        return preprocessed_batch
+        return values_batch
+
+    def _update_template(self, value_names, expected_names=()):
+        # expressions only depend on which attributes are set/checked, so they are built once per combination.
+        # set and expected values use disjoint placeholder prefixes so attribute names cannot collide
+        template_key = (value_names, expected_names)
+        if template_key not in self._update_templates:
+            template = {
+                "UpdateExpression": "SET " + ", ".join([f"#{k} = :v_{k}" for k in value_names]),
+                "ExpressionAttributeNames": {f"#{k}": k for k in value_names + expected_names},
+            }
+            if expected_names:
+                template["ConditionExpression"] = " AND ".join(
+                    [f"#{k} = :c_{k}" for k in expected_names]
+                )
+            self._update_templates[template_key] = template
+        return self._update_templates[template_key]
 
-    def update_item(self, key, values):
+    def _update_request(self, key, values, expected=None):
         self._validate_primary_key(key)
-        expression_values = self.translate_to_dynamodb_item(values, None, ":")
-        expression_attribute_names = {f"#{k}": k for k in values if k in self.attributes_by_name}
-        update_expression = "SET " + ", ".join([f"#{k} = :{k}" for k in values if k in self.attributes_by_name])
-        self.client.update_item(
-            TableName=self.table_configuration.table_name,
-            Key=self._key_from_params(key),
-            UpdateExpression=update_expression,
-            ExpressionAttributeValues=expression_values,
-            ExpressionAttributeNames=expression_attribute_names,
-        )
+        value_names = tuple(k for k in values if k in self.attributes_by_name)
+        if not value_names:
+            raise InputError("No valid update values provided")
+        expected = expected or {}
+        expected_names = tuple(k for k in expected if k in self.attributes_by_name)
+        if len(expected_names) != len(expected):
+            raise InputError("Invalid attribute in expected values")
+        expression_values = self.translate_to_dynamodb_item(values, None, ":v_")
+        expression_values.update(self.translate_to_dynamodb_item(expected, None, ":c_"))
+        request = {
+            "TableName": self.table_configuration.table_name,
+            "Key": self._key_from_params(key),
+            "ExpressionAttributeValues": expression_values,
+        }
+        request.update(self._update_template(value_names, expected_names))
+        return request
+
+    def update_item(self, key, values, expected=None):
+        request = self._update_request(key, values, expected)
+        try:
+            self.client.update_item(**request)
+        except self.client.exceptions.ConditionalCheckFailedException:
+            raise InputError("Item does not match expected values")
         return values
 
+    def update_items(self, updates, transactional=False, max_concurrency=None):
+        # each update is {"key": ..., "values": ..., "expected": ...}; "expected" (optional) holds attribute
+        # values the stored item must still have for the update to apply (optimistic concurrency).
+        # transactional=True writes all-or-nothing groups of up to 100 updates
+        if not updates:
+            raise InputError("Missing updates")
+        if len(updates) > TableBase.MAX_BATCH:
+            raise InputError(f"Cannot update more than {TableBase.MAX_BATCH} records at once")
+        requests = [self._update_request(u.get("key"), u.get("values", {}), u.get("expected")) for u in updates]
+
+        if transactional:
+            chunk_size = Table.MAX_DYNAMODB_TRANSACTION
+            chunks = [requests[i:i+chunk_size] for i in range(0, len(requests), chunk_size)]
+
+            def write(chunk):
+                try:
+                    self.client.transact_write_items(TransactItems=[{"Update": r} for r in chunk])
+                except self.client.exceptions.TransactionCanceledException:
+                    return False
+                return True
+        else:
+            chunk_size = 1
+            chunks = [[r] for r in requests]
+
+            def write(chunk):
+                try:
+                    self.client.update_item(**chunk[0])
+                except self.client.exceptions.ConditionalCheckFailedException:
+                    return False
+                return True
+
+        max_concurrency = max_concurrency or Table.DEFAULT_UPDATE_CONCURRENCY
+        with ThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+            results = list(executor.map(write, chunks))
+
+        failed = [i for i, ok in enumerate(results) if not ok]
+        if failed:
+            if transactional:
+                failed_ranges = ", ".join([f"{i * chunk_size}-{min((i + 1) * chunk_size, len(requests)) - 1}"
+                                           for i in failed])
+                raise InputError(f"Transactions for updates {failed_ranges} were cancelled")
+            raise InputError(f"Updates {', '.join(str(i) for i in failed)} do not match expected values")
+        return [u["values"] for u in updates]
+
     def modify_table(self, changes):
         if changes.removed_attributes:
             raise InputError("Removing attributes is not supported for DynamoDB tables")
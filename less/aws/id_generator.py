@@ -0,0 +1,69 @@
+import os
+import secrets
+import threading
+import time
+
+CHARS_FOR_KEY = "ACDEFGHIJKLMNPQRSTUVWXYZabcdefghijkmnpqrsuvwxyz2345679"
+# 22 chars from a 54 char alphabet is ~126 bits, so collisions are negligible at any realistic volume
+RANDOM_ID_LENGTH = 22
+
+# Crockford base32, used for ULID-style ids so that lexical order matches creation order
+TIME_ORDERED_CHARS = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+TIME_ORDERED_ID_LENGTH = 26
+_RANDOM_BITS = 80
+_MAX_RANDOM = (1 << _RANDOM_BITS) - 1
+
+
+def random_ids(count, length=RANDOM_ID_LENGTH):
+    # the alphabet has 54 chars, so reduce bytes with rejection sampling to keep the distribution uniform
+    alphabet_size = len(CHARS_FOR_KEY)
+    limit = 256 - 256 % alphabet_size
+    needed = count * length
+    chars = []
+    while len(chars) < needed:
+        chars += [CHARS_FOR_KEY[b % alphabet_size] for b in os.urandom(needed - len(chars) + 16) if b < limit]
+    chars = "".join(chars[:needed])
+    return [chars[i:i+length] for i in range(0, needed, length)]
+
+
+def random_id():
+    return random_ids(1)[0]
+
+
+def _encode_time_ordered(value):
+    chars = []
+    for _ in range(TIME_ORDERED_ID_LENGTH):
+        chars.append(TIME_ORDERED_CHARS[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class TimeOrderedIdGenerator(object):
+    # ULID layout: 48 bits of millisecond timestamp followed by 80 random bits.
+    # Ids generated in the same millisecond increment the random part, so they stay unique and sorted
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._last_timestamp = -1
+        self._last_random = 0
+
+    def __call__(self, count):
+        with self._lock:
+            timestamp = int(time.time() * 1000)
+            if timestamp > self._last_timestamp:
+                self._last_timestamp = timestamp
+                # leave room to increment for the whole batch without overflowing
+                self._last_random = secrets.randbits(_RANDOM_BITS - 1)
+            timestamp = self._last_timestamp
+            first = self._last_random + 1
+            if first + count > _MAX_RANDOM:
+                raise OverflowError("Too many time ordered ids generated in one millisecond")
+            self._last_random = first + count - 1
+        prefix = timestamp << _RANDOM_BITS
+        return [_encode_time_ordered(prefix | r) for r in range(first, first + count)]
+
+
+time_ordered_ids = TimeOrderedIdGenerator()
+
+
+def time_ordered_id():
+    return time_ordered_ids(1)[0]
@@ -1,12 +1,26 @@
 import psycopg2
 from psycopg2.extras import RealDictCursor
 
-from less.aws.table_base import InputError, generate_id, TableBase
+from less.aws.table_base import InputError, TableBase
+
+# live table schemas by (host, db, schema, table), shared by all PostgresTable instances in the process
+_schema_cache = {}
+
+
+class TableSchema(object):
+    def __init__(self, columns):
+        # columns: lowercased name -> attribute type ("string", "int", "bool")
+        self.columns = columns
 
 
 class PostgresTable(TableBase):
-    def __init__(self, table_configuration, connection_info):
+    _create_table_sql = None
+
+    def __init__(self, table_configuration, connection_info, id_generator=None):
         self.table_configuration = table_configuration
+        if id_generator:
+            # e.g. id_generator.time_ordered_ids, which keeps primary key index inserts local
+            self.id_generator = id_generator
         self.attributes_by_name = {
             k["name"]: k for k in self.table_configuration.attributes
         }
@@ -40,14 +54,39 @@ class PostgresTable(TableBase):
         schema = self._schema_name
         return f"{schema}.{self.table_configuration.table_name}"
 
+    def _schema_cache_key(self, table_name=None):
+        return (
+            self.connection_info.get("host"),
+            self.connection_info.get("db"),
+            self._schema_name.lower(),
+            (table_name or self.table_configuration.table_name).lower(),
+        )
+
+    def _load_schema(self, cur):
+        # identifiers are never quoted in our DDL, so postgres stores them lowercased
+        params = [self._schema_name.lower(), self.table_configuration.table_name.lower()]
+        cur.execute("SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_schema = %s AND table_name = %s ORDER BY ordinal_position;", params)
+        columns = {
+            r["column_name"]: PostgresTable.postgres_type_to_attribute_type(r["data_type"]) for r in cur.fetchall()
+        }
+        if not columns:
+            raise InputError(f"Table {self._table_name} not found")
+        return TableSchema(columns)
+
+    def live_schema(self, cur=None):
+        # cached per process for reads and only invalidated by DDL from this process. It can be stale when
+        # other processes run DDL, so modify_table always loads the schema fresh instead of using this
+        key = self._schema_cache_key()
+        if key not in _schema_cache:
+            _schema_cache[key] = self._load_schema(cur) if cur else self._with_cursor(self._load_schema)
+        return _schema_cache[key]
+
+    def invalidate_schema_cache(self, table_name=None):
+        _schema_cache.pop(self._schema_cache_key(table_name), None)
+
     def _convert_attribute(self, name, val):
-        if name not in self.attributes_by_name:
-            raise InputError(f"Invalid attribute {name}")
-        type = self.attributes_by_name[name]["type"]
-        if type == "int":
-            return int(val)
-        else:
-            return val
+        return self.validator.convert(name, val)
 
     def _with_cursor(self, func):
         with self.connect() as conn:
@@ -83,32 +122,18 @@ class PostgresTable(TableBase):
         if len(values_batch) > TableBase.MAX_BATCH:
             raise InputError(f"Cannot add more than {TableBase.MAX_BATCH} records at once")
 
-        for i, values in enumerate(values_batch):
-            if before_put:
+        if before_put:
+            for values in values_batch:
                 before_put(values)
+        self._populate_auto_generated_attributes(values_batch)
 
-            for a in self.table_configuration.auto_generated_attributes:
-                values[a] = generate_id()
-
-        columns_to_insert = [k for k in values_batch[0] if k in self.attributes_by_name]
+        columns_to_insert = self.validator.validate(values_batch, same_columns=True)
         columns_list = ", ".join(columns_to_insert)
         params_string = "(" + ", ".join(["%s" for c in columns_to_insert]) + ")"
-
-        # separate loop because we want to populate auto-generated cols first,
-        # before ensuring same columns across records
-        for i, values in enumerate(values_batch):
-            if [f["name"] for f in self.table_configuration.required_attributes if f["name"] not in values]:
-                raise InputError("Missing required fields")
-            for f in values:
-                if f in self.attributes_by_name and f not in columns_to_insert:
-                    raise InputError(f"Record {i} is missing '{f}'' which is present in record 0; all records "
-                                     "must have same columns when batching")
         params = []
-        multiple_record_params_string = []
         for values in values_batch:
-            params += [values[k] for k in values if k in self.attributes_by_name]
-            multiple_record_params_string.append(params_string)
-        multiple_record_params_string = ", ".join(multiple_record_params_string)
+            params += [values[k] for k in columns_to_insert]
+        multiple_record_params_string = ", ".join([params_string for values in values_batch])
         sql = f"INSERT INTO {self._table_name} ({columns_list}) VALUES {multiple_record_params_string}"
 
         def insert(cur):
@@ -184,12 +209,16 @@ class PostgresTable(TableBase):
         return self._with_cursor(get)
 
     @staticmethod
-    def attribute_to_postgres_sql(a, type_change=False):
-        postgres_type = {
+    def attribute_to_postgres_type(a):
+        return {
             "string": "text",
             "int": "numeric",
             "bool": "boolean",
         }.get(a.get("type", "string"), "text")
+
+    @staticmethod
+    def attribute_to_postgres_sql(a, type_change=False):
+        postgres_type = PostgresTable.attribute_to_postgres_type(a)
         name = a["name"]
         nullable = " NOT NULL" if a.get("required", False) else ""
         type_change_sql = "TYPE " if type_change else ""
@@ -220,6 +249,11 @@ class PostgresTable(TableBase):
 
     @property
     def create_table_sql(self):
+        if self._create_table_sql is None:
+            self._create_table_sql = self._build_create_table_sql()
+        return list(self._create_table_sql)
+
+    def _build_create_table_sql(self):
         pk_sql = ", ".join(self.table_configuration.primary_key)
         pk_sql = f", PRIMARY KEY ({pk_sql})" if self.table_configuration.primary_key else ""
         columns_sql = ", \n".join([PostgresTable.attribute_to_postgres_sql(a)
@@ -238,23 +272,62 @@ class PostgresTable(TableBase):
     def drop_table_sql(self):
         return f"DROP TABLE IF EXISTS {self._table_name};"
 
-    def modify_table(self, changes):
-        remove_columns = [f"DROP COLUMN {a['name']}" for a in changes.removed_attributes]
-        add_columns = [f"ADD COLUMN {PostgresTable.attribute_to_postgres_sql(a)}" for a in changes.added_attributes]
-        columns_changed_type = [a for a in changes.changed_attributes if
-                                "original_type" in a and a["original_type"] != a["type"]]
-        column_type_changes = [f"ALTER COLUMN {self.attribute_to_postgres_sql(a, True)}" for a in columns_changed_type]
-        column_changes = ", ".join(remove_columns + add_columns + column_type_changes)
-        sql = f"ALTER TABLE {self._table_name} {column_changes};"
+    @staticmethod
+    def _column_type_changes(a):
+        # ALTER COLUMN ... TYPE does not take a NOT NULL suffix, nullability is its own subcommand
+        changes = [f"ALTER COLUMN {a['name']} TYPE {PostgresTable.attribute_to_postgres_type(a)}"]
+        if a.get("required", False):
+            changes.append(f"ALTER COLUMN {a['name']} SET NOT NULL")
+        return changes
+
+    def _modify_table_sql(self, changes, schema):
+        # diff the requested changes against the live columns so only statements that change something are issued.
+        # live column names are lowercased, so config names are compared lowercased too
+        columns = dict(schema.columns)
+        renames = []
+        for a in changes.changed_attributes:
+            if "original_name" in a and a["original_name"].lower() != a["name"].lower() and \
+                    a["original_name"].lower() in columns and a["name"].lower() not in columns:
+                renames.append(f"ALTER TABLE {self._table_name} RENAME {a['original_name']} TO {a['name']};")
+                columns[a["name"].lower()] = columns.pop(a["original_name"].lower())
+
+        column_changes = []
+        for a in changes.removed_attributes:
+            if a["name"].lower() in columns:
+                column_changes.append(f"DROP COLUMN {a['name']}")
+                del columns[a["name"].lower()]
+        for a in changes.added_attributes:
+            name = a["name"].lower()
+            if name not in columns:
+                column_changes.append(f"ADD COLUMN {PostgresTable.attribute_to_postgres_sql(a)}")
+            elif columns[name] != a.get("type", "string"):
+                column_changes += PostgresTable._column_type_changes(a)
+            columns[name] = a.get("type", "string")
+        for a in changes.changed_attributes:
+            name = a["name"].lower()
+            if "original_type" in a and a["original_type"] != a["type"] and \
+                    name in columns and columns[name] != a["type"]:
+                column_changes += PostgresTable._column_type_changes(a)
+                columns[name] = a["type"]
+
+        # postgres does not allow RENAME together with other actions, everything else is one ALTER TABLE
+        statements = renames
+        if column_changes:
+            statements.append(f"ALTER TABLE {self._table_name} {', '.join(column_changes)};")
+        return statements
 
+    def modify_table(self, changes):
         def modify_table(cur):
-            columns_changed_name = [a for a in changes.changed_attributes
-                                    if "original_name" in a and a["original_name"] != a["name"]]
-            for a in columns_changed_name:
-                cur.execute(f"ALTER TABLE {self._table_name} RENAME {a['original_name']} TO {a['name']};")
-            if column_changes:
+            # DDL may have run in another process, so the diff is always against a fresh load, never the cache
+            statements = self._modify_table_sql(changes, self._load_schema(cur))
+            for sql in statements:
                 cur.execute(sql)
-        self._with_cursor(modify_table)
+            return statements
+        try:
+            return self._with_cursor(modify_table)
+        finally:
+            # after the transaction has committed, so a concurrent reload cannot cache the pre-DDL schema
+            self.invalidate_schema_cache()
 
     def rename_table(self, new_name):
         def alter(cur):
@@ -268,7 +341,11 @@ RENAME TO {new_name}__{ind}"""
                     sql = f"""ALTER INDEX IF EXISTS {self._table_name}_{ind}
 RENAME TO {new_name}__{ind}"""
                     cur.execute(sql)
-        self._with_cursor(alter)
+        try:
+            self._with_cursor(alter)
+        finally:
+            self.invalidate_schema_cache()
+            self.invalidate_schema_cache(new_name)
 
     @property
     def is_sql_query_supported(self):
@@ -1,10 +1,8 @@
-import random
-
-CHARS_FOR_KEY = "ACDEFGHIJKLMNPQRSTUVWXYZabcdefghijkmnpqrsuvwxyz2345679"
+from less.aws.id_generator import CHARS_FOR_KEY, random_id, random_ids
 
 
 def generate_id():
-    return "".join(random.choices(CHARS_FOR_KEY, k=10))
+    return random_id()
 
 
 class InputError(Exception):
@@ -14,6 +12,26 @@ class InputError(Exception):
 
 class TableBase(object):
     MAX_BATCH = 1000
+    _validator = None
+    # callable taking a count and returning that many unique ids, see less.aws.id_generator
+    id_generator = staticmethod(random_ids)
+
+    def _populate_auto_generated_attributes(self, values_batch):
+        attributes = self.table_configuration.auto_generated_attributes
+        if not attributes:
+            return
+        ids = iter(self.id_generator(len(values_batch) * len(attributes)))
+        for values in values_batch:
+            for a in attributes:
+                values[a] = next(ids)
+
+    @property
+    def validator(self):
+        if self._validator is None:
+            # imported here since batch_validator depends on this module
+            from less.aws.batch_validator import BatchValidator
+            self._validator = BatchValidator(self.table_configuration)
+        return self._validator
 
     def _validate_primary_key(self, key):
         if not key: